@@ -65,7 +65,10 @@ install_dependencies() {
     
     # 安装Python包
     print_info "安装Python依赖包..."
-    pip3 install flask ruamel.yaml
+    pip3 install flask ruamel.yaml pyyaml waitress
+    
+    # orjson 为可选加速组件，部分架构没有预编译包，安装失败不影响使用
+    pip3 install orjson || print_warning "orjson 安装失败，将使用标准库 json"
     
     print_success "依赖安装完成"
 }
@@ -1,18 +1,42 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, send_file, Response
 import os
 import subprocess
 import json
+import re
+import urllib.parse
 import sqlite3
 from datetime import datetime
 import threading
 import time
+import queue
+import sys
+import tempfile
+import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 
-from protocol_parser import ProtocolParser
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from protocol_parser import ProtocolParser, _b64d
 
 app = Flask(__name__)
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
+
+def _json(obj, status=200):
+    """生成JSON响应，优先使用 orjson 序列化"""
+    if orjson is not None:
+        body = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        body = app.json.dumps(obj)
+    return app.response_class(body, status=status, mimetype='application/json')
 
 # 配置
 ROOT_DIR = "/root/OpenClashManage"
@@ -20,11 +44,33 @@ NODES_FILE = f"{ROOT_DIR}/wangluo/nodes.txt"
 LOG_FILE = f"{ROOT_DIR}/wangluo/log.txt"
 CONFIG_FILE = "/etc/openclash/config.yaml"
 PID_FILE = "/tmp/openclash_watchdog.pid"
+OPENCLASH_PID_FILE = "/var/run/openclash.pid"
+# PID 文件不可用时是否回退到调用 init 脚本检查状态
+OPENCLASH_STATUS_FALLBACK = True
+DB_PATH = f"{ROOT_DIR}/web/database.db"
+# 外部命令超时（秒）
+STATUS_TIMEOUT = 10
+SUBPROCESS_TIMEOUT = 60
+# /api/sync 等待同步完成的最长时间，超时后转为后台执行
+SYNC_WAIT_TIMEOUT = 30
+# 同步失败时返回的日志行数及最大字符数
+SYNC_LOG_LINES = 20
+SYNC_OUTPUT_LIMIT = 4096
+
+# 同步脚本位于项目根目录，直接在进程内调用
+sys.path.insert(0, ROOT_DIR)
 
 # 数据库初始化
 def init_db():
-    conn = sqlite3.connect(f"{ROOT_DIR}/web/database.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    # auto_vacuum 只在建表前设置才生效，对已有数据库无影响
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL 为数据库持久属性，设置一次即可；synchronous 需每个连接单独设置
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=134217728")
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS operations (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,8 +80,68 @@ def init_db():
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    # 每插入1000条清理一次，只保留最近 OPS_RETENTION 条记录
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trim_ops AFTER INSERT ON operations
+        WHEN NEW.id % 1000 = 0
+        BEGIN
+            DELETE FROM operations WHERE id <= NEW.id - {OPS_RETENTION};
+        END
+    ''')
     conn.commit()
     conn.close()
+    threading.Thread(target=_op_writer, daemon=True).start()
+
+# 每个线程复用一个数据库连接，写操作由全局锁串行化
+_tls = threading.local()
+_db_write_lock = threading.Lock()
+
+def _conn():
+    """获取当前线程的数据库连接"""
+    conn = getattr(_tls, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA cache_size=-20000")
+        _tls.conn = conn
+    return conn
+
+# 操作记录先入队，由后台线程批量提交
+_op_queue = queue.Queue()
+OP_BATCH_SIZE = 500
+OPS_RETENTION = 10000
+# 每提交多少批执行一次增量回收
+VACUUM_EVERY = 100
+
+def _op_writer():
+    """后台批量写入操作记录"""
+    batches = 0
+    while True:
+        rows = [_op_queue.get()]
+        try:
+            while len(rows) < OP_BATCH_SIZE:
+                rows.append(_op_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        conn = _conn()
+        try:
+            with _db_write_lock:
+                conn.execute("BEGIN")
+                conn.executemany('''
+                    INSERT INTO operations (operation, status, message)
+                    VALUES (?, ?, ?)
+                ''', rows)
+                conn.execute("COMMIT")
+                batches += 1
+                if batches % VACUUM_EVERY == 0:
+                    # execute 只执行一步（释放一页），executescript 才会执行到底
+                    conn.executescript("PRAGMA incremental_vacuum(100);")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"[app.py] Failed to write operations: {e}")
 
 # 初始化数据库
 init_db()
@@ -43,31 +149,46 @@ init_db()
 # 初始化协议解析器
 parser = ProtocolParser()
 
+# 首页模板为静态内容，启动时渲染一次
+with app.app_context():
+    _INDEX = render_template('index.html')
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return Response(_INDEX, mimetype='text/html',
+                    headers={'Cache-Control': 'public, max-age=3600'})
+
+# 状态缓存，合并前端的高频轮询
+STATUS_CACHE_TTL = 2.0
+_status_cache = {'t': 0, 'v': None}
+_status_lock = threading.Lock()
 
 @app.route('/api/status')
 def get_status():
     """获取系统状态"""
-    status = {
-        'watchdog_running': os.path.exists(PID_FILE),
-        'openclash_running': check_openclash_status(),
-        'nodes_count': get_nodes_count(),
-        'config_exists': os.path.exists(CONFIG_FILE),
-        'last_sync': get_last_sync_time()
-    }
-    return jsonify(status)
+    with _status_lock:
+        if _status_cache['v'] is not None and time.monotonic() - _status_cache['t'] < STATUS_CACHE_TTL:
+            return _json(_status_cache['v'])
+
+        status = {
+            'watchdog_running': os.path.exists(PID_FILE),
+            'openclash_running': check_openclash_status(),
+            'nodes_count': get_nodes_count(),
+            'config_exists': os.path.exists(CONFIG_FILE),
+            'last_sync': get_last_sync_time()
+        }
+        _status_cache['t'] = time.monotonic()
+        _status_cache['v'] = status
+    return _json(status)
 
 @app.route('/api/logs')
 def get_logs():
     """获取日志"""
     try:
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            logs = f.readlines()
-        return jsonify({'logs': logs[-100:]})  # 返回最后100行
+        logs = _log_tail()[0][-100:]
+        return _json({'logs': logs})  # 返回最后100行
     except:
-        return jsonify({'logs': []})
+        return _json({'logs': []})
 
 @app.route('/api/nodes')
 def get_nodes():
@@ -75,43 +196,48 @@ def get_nodes():
     try:
         with open(NODES_FILE, 'r', encoding='utf-8') as f:
             content = f.read()
-        return jsonify({'content': content})
+        return _json({'content': content})
     except:
-        return jsonify({'content': ''})
+        return _json({'content': ''})
 
 @app.route('/api/nodes', methods=['POST'])
 def update_nodes():
     """更新节点文件"""
     try:
         content = request.json.get('content', '')
-        with open(NODES_FILE, 'w', encoding='utf-8') as f:
-            f.write(content)
+        with _nodes_lock:
+            _write_nodes(content)
+            _invalidate_nodes_cache()
         
         # 记录操作
         record_operation('update_nodes', 'success', '节点文件已更新')
         
-        return jsonify({'status': 'success', 'message': '节点文件已更新'})
+        return _json({'status': 'success', 'message': '节点文件已更新'})
     except Exception as e:
         record_operation('update_nodes', 'error', str(e))
-        return jsonify({'status': 'error', 'message': str(e)})
+        return _json({'status': 'error', 'message': str(e)})
 
 @app.route('/api/sync', methods=['POST'])
 def manual_sync():
     """手动触发同步"""
-    try:
-        # 执行同步脚本
-        result = subprocess.run(['python3', f'{ROOT_DIR}/zr.py'], 
-                              capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            record_operation('manual_sync', 'success', '手动同步成功')
-            return jsonify({'status': 'success', 'message': '同步成功'})
-        else:
-            record_operation('manual_sync', 'error', result.stderr)
-            return jsonify({'status': 'error', 'message': result.stderr})
-    except Exception as e:
-        record_operation('manual_sync', 'error', str(e))
-        return jsonify({'status': 'error', 'message': str(e)})
+    with _sync_state_lock:
+        if _sync_state['running']:
+            return _json({'status': 'running', 'message': '同步正在进行中'})
+        _sync_state.update(running=True, status='running', message='同步正在进行中，请稍后查看结果')
+    
+    # 在后台线程执行同步脚本，超时则直接返回，结果通过 /api/sync/status 查询
+    worker = threading.Thread(target=_sync_worker, daemon=True)
+    worker.start()
+    worker.join(SYNC_WAIT_TIMEOUT)
+    
+    with _sync_state_lock:
+        return _json({'status': _sync_state['status'], 'message': _sync_state['message']})
+
+@app.route('/api/sync/status')
+def sync_status():
+    """获取同步任务状态"""
+    with _sync_state_lock:
+        return _json(dict(_sync_state))
 
 @app.route('/api/watchdog', methods=['POST'])
 def toggle_watchdog():
@@ -124,21 +250,25 @@ def toggle_watchdog():
                            stdout=subprocess.DEVNULL, 
                            stderr=subprocess.DEVNULL)
             record_operation('start_watchdog', 'success', '守护进程已启动')
-            return jsonify({'status': 'success', 'message': '守护进程已启动'})
+            return _json({'status': 'success', 'message': '守护进程已启动'})
         except Exception as e:
-            return jsonify({'status': 'error', 'message': str(e)})
+            return _json({'status': 'error', 'message': str(e)})
     
     elif action == 'stop':
         try:
             if os.path.exists(PID_FILE):
                 with open(PID_FILE, 'r') as f:
                     pid = f.read().strip()
-                subprocess.run(['kill', pid])
+                subprocess.run(['kill', pid], timeout=SUBPROCESS_TIMEOUT)
                 os.remove(PID_FILE)
             record_operation('stop_watchdog', 'success', '守护进程已停止')
-            return jsonify({'status': 'success', 'message': '守护进程已停止'})
+            return _json({'status': 'success', 'message': '守护进程已停止'})
+        except subprocess.TimeoutExpired:
+            message = '停止守护进程超时'
+            record_operation('stop_watchdog', 'error', message)
+            return _json({'status': 'error', 'message': message})
         except Exception as e:
-            return jsonify({'status': 'error', 'message': str(e)})
+            return _json({'status': 'error', 'message': str(e)})
 
 @app.route('/api/openclash', methods=['POST'])
 def control_openclash():
@@ -149,75 +279,165 @@ def control_openclash():
         if action == 'restart':
             subprocess.run(['/etc/init.d/openclash', 'restart'])
             record_operation('restart_openclash', 'success', 'OpenClash已重启')
-            return jsonify({'status': 'success', 'message': 'OpenClash已重启'})
+            return _json({'status': 'success', 'message': 'OpenClash已重启'})
         elif action == 'stop':
             subprocess.run(['/etc/init.d/openclash', 'stop'])
             record_operation('stop_openclash', 'success', 'OpenClash已停止')
-            return jsonify({'status': 'success', 'message': 'OpenClash已停止'})
+            return _json({'status': 'success', 'message': 'OpenClash已停止'})
         elif action == 'start':
             subprocess.run(['/etc/init.d/openclash', 'start'])
             record_operation('start_openclash', 'success', 'OpenClash已启动')
-            return jsonify({'status': 'success', 'message': 'OpenClash已启动'})
+            return _json({'status': 'success', 'message': 'OpenClash已启动'})
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)})
+        return _json({'status': 'error', 'message': str(e)})
 
 # 辅助函数
+_sync_lock = threading.Lock()
+# 同步任务状态，由后台线程更新
+_sync_state = {'running': False, 'status': None, 'message': ''}
+_sync_state_lock = threading.Lock()
+
+def run_sync():
+    """在进程内执行同步脚本，返回 (退出码, 日志尾部)"""
+    # 延迟导入，同步模块或其依赖缺失时不影响面板启动
+    from zr import main as zr_main
+    
+    with _sync_lock:
+        try:
+            returncode = zr_main()
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+    
+    # 同步脚本的输出均经 write_log 写入日志文件，直接读取日志尾部
+    try:
+        output = ''.join(_log_tail()[0][-SYNC_LOG_LINES:])[-SYNC_OUTPUT_LIMIT:]
+    except OSError:
+        output = ''
+    return returncode, output
+
+def _sync_worker():
+    """后台执行同步并记录结果"""
+    try:
+        returncode, output = run_sync()
+        if returncode == 0:
+            status, message = 'success', '同步成功'
+            record_operation('manual_sync', 'success', '手动同步成功')
+        else:
+            status, message = 'error', output
+            record_operation('manual_sync', 'error', output)
+    except Exception as e:
+        status, message = 'error', str(e)
+        record_operation('manual_sync', 'error', str(e))
+    
+    with _sync_state_lock:
+        _sync_state.update(running=False, status=status, message=message)
+
 def check_openclash_status():
     """检查OpenClash状态"""
+    try:
+        with open(OPENCLASH_PID_FILE, 'r') as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return True
+    except PermissionError:
+        # 进程存在但无权发送信号
+        return True
+    except ProcessLookupError:
+        return False
+    except (OSError, ValueError):
+        if not OPENCLASH_STATUS_FALLBACK:
+            return False
+
     try:
         result = subprocess.run(['/etc/init.d/openclash', 'status'], 
-                              capture_output=True, text=True)
+                              capture_output=True, text=True, timeout=STATUS_TIMEOUT)
         return 'running' in result.stdout.lower()
     except:
         return False
 
+def _stat_key(path):
+    """文件缓存键：修改时间、大小和 inode 任一变化即失效（兼容 mtime 精度较粗的文件系统）"""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+# 节点数量缓存，节点文件变化时失效
+_nodes_count_cache = {'stat': None, 'data': 0}
+
 def get_nodes_count():
     """获取节点数量"""
     try:
-        with open(NODES_FILE, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
-        return len(lines)
+        key = _stat_key(NODES_FILE)
+        if key != _nodes_count_cache['stat']:
+            with open(NODES_FILE, 'r', encoding='utf-8') as f:
+                count = sum(1 for line in f if line.strip())
+            _nodes_count_cache['data'] = count
+            _nodes_count_cache['stat'] = key
+        return _nodes_count_cache['data']
     except:
         return 0
 
 def get_last_sync_time():
     """获取最后同步时间"""
     try:
-        with open(LOG_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            for line in reversed(lines):
-                if '同步完成' in line or '配置写入完成' in line:
-                    return line.split(' ')[0] + ' ' + line.split(' ')[1]
+        return _log_tail()[1]
     except:
-        pass
-    return '未知'
+        return '未知'
+
+def _iter_lines_reversed(path, block=8192):
+    """从文件末尾向前逐行读取，避免整个文件载入内存"""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b''
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + buf).splitlines(keepends=True)
+            # 块首的行可能不完整，留到下一轮与更早的数据拼接
+            buf = lines.pop(0) if pos > 0 else b''
+            for line in reversed(lines):
+                yield line.decode('utf-8', errors='replace')
+
+# 日志尾部读取结果缓存，日志文件变化时失效
+_log_cache = {'stat': None, 'data': None}
+
+def _log_tail(nlines=200):
+    """反向读取一次日志，返回 (最后 nlines 行, 最后同步时间)"""
+    key = _stat_key(LOG_FILE)
+    if key == _log_cache['stat']:
+        return _log_cache['data']
+    
+    lines = []
+    last_sync = None
+    for line in _iter_lines_reversed(LOG_FILE):
+        if len(lines) < nlines:
+            lines.append(line)
+        if last_sync is None and ('同步完成' in line or '配置写入完成' in line):
+            parts = line.split(' ')
+            last_sync = parts[0] + ' ' + parts[1] if len(parts) > 1 else '未知'
+        if len(lines) >= nlines and last_sync is not None:
+            break
+    lines.reverse()
+    
+    data = (lines, last_sync or '未知')
+    _log_cache.update(stat=key, data=data)
+    return data
 
 def record_operation(operation, status, message):
-    """记录操作到数据库"""
-    conn = sqlite3.connect(f"{ROOT_DIR}/web/database.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO operations (operation, status, message)
-        VALUES (?, ?, ?)
-    ''', (operation, status, message))
-    conn.commit()
-    conn.close()
+    """记录操作到数据库（异步批量写入）"""
+    _op_queue.put((operation, status, message))
 
 @app.route('/api/operations')
 def get_operations():
     """获取操作历史"""
-    conn = sqlite3.connect(f"{ROOT_DIR}/web/database.db")
-    cursor = conn.cursor()
-    cursor.execute('''
+    operations = _conn().execute('''
         SELECT operation, status, message, timestamp 
         FROM operations 
-        ORDER BY timestamp DESC 
+        ORDER BY id DESC 
         LIMIT 50
-    ''')
-    operations = cursor.fetchall()
-    conn.close()
+    ''').fetchall()
     
-    return jsonify({
+    return _json({
         'operations': [
             {
                 'operation': op[0],
@@ -229,148 +449,244 @@ def get_operations():
         ]
     })
 
+# 链接协议前缀 -> 显示类型
+SCHEME_TYPES = {
+    'ss': 'Shadowsocks',
+    'vmess': 'VMess',
+    'vless': 'VLESS',
+    'trojan': 'Trojan',
+    'ssr': 'ShadowsocksR'
+}
+
+# Shadowsocks 解码后的 method:password@host:port
+_SS_RE = re.compile(r'^([^:]+):([^@]+)@([^:]+):(\d+)$')
+
+# 节点文件读改写锁
+_nodes_lock = threading.Lock()
+
+# 节点列表解析结果缓存，节点文件变化时失效
+_nodes_cache = {'stat': None, 'data': None}
+_nodes_list_cache = {'stat': None, 'data': None}
+
+def _invalidate_nodes_cache():
+    """节点文件被修改后清除缓存"""
+    _nodes_cache['stat'] = None
+    _nodes_list_cache['stat'] = None
+
+def _node_name(line, idx):
+    """取链接中第一个 '#' 之后的备注作为节点名称，没有则按序号命名"""
+    name = line.partition('#')[2]
+    return urllib.parse.unquote(name) if name else f"节点{idx+1}"
+
 @app.route('/api/parse_nodes')
 def parse_nodes_api():
     """解析节点文件并返回节点列表"""
     try:
+        key = _stat_key(NODES_FILE)
+        if key == _nodes_cache['stat']:
+            return _json(_nodes_cache['data'])
+        
         nodes = []
-        with open('/root/OpenClashManage/wangluo/nodes.txt', 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+        lines, _, node_idx = _read_node_lines()
+        for idx, i in enumerate(node_idx):
+            line = lines[i]
+            scheme, _, encoded = line.partition('://')
+            
+            # 解析节点信息
+            node_info = {
+                "name": _node_name(line, idx),
+                "type": SCHEME_TYPES.get(scheme, "Shadowsocks"),
+                "server": line,
+                "port": "",
+            }
             
-            for idx, line in enumerate(lines):
-                # 解析节点信息
-                node_info = {
-                    "name": f"节点{idx+1}",
-                    "type": "Shadowsocks",
-                    "server": line,
-                    "port": "",
-                }
-                
-                # 尝试从链接中提取更多信息
-                if line.startswith('ss://'):
-                    try:
-                        # 解析Shadowsocks链接
-                        import base64
-                        import urllib.parse
-                        
-                        # 移除 ss:// 前缀
-                        encoded = line[5:]
-                        
-                        # 分离配置和备注
-                        if '#' in encoded:
-                            config_part, name_part = encoded.split('#', 1)
-                            node_info["name"] = urllib.parse.unquote(name_part)
-                        else:
-                            config_part = encoded
-                        
-                        # 解析base64部分
-                        if '@' in config_part:
-                            method_password, host_port = config_part.split('@')
-                            method, password = method_password.split(':')
-                            host, port = host_port.split(':')
-                            
-                            node_info.update({
-                                "name": node_info["name"],
-                                "type": "Shadowsocks",
-                                "server": host,
-                                "port": port,
-                                "method": method,
-                                "password": password
-                            })
-                    except:
-                        # 如果解析失败，保持原始信息
-                        pass
-                elif line.startswith('vmess://'):
-                    node_info["type"] = "VMess"
-                elif line.startswith('vless://'):
-                    node_info["type"] = "VLESS"
-                elif line.startswith('trojan://'):
-                    node_info["type"] = "Trojan"
-                elif line.startswith('ssr://'):
-                    node_info["type"] = "ShadowsocksR"
-                
-                nodes.append(node_info)
+            # 尝试从链接中提取更多信息
+            if scheme == 'ss':
+                try:
+                    # 解析Shadowsocks链接
+                    # 分离配置和备注
+                    config_part = encoded.partition('#')[0]
+                    
+                    # 去掉插件参数
+                    config_part = config_part.split('?', 1)[0].rstrip('/')
+                    
+                    # 解析base64部分
+                    if '@' in config_part:
+                        # SIP002: ss://base64(method:password)@host:port
+                        userinfo, host_port = config_part.rsplit('@', 1)
+                        if ':' not in userinfo:
+                            userinfo = _b64d(userinfo).decode('utf-8')
+                        raw = f"{userinfo}@{host_port}"
+                    else:
+                        # ss://base64(method:password@host:port)
+                        raw = _b64d(config_part).decode('utf-8')
+                    
+                    m = _SS_RE.match(raw)
+                    if m:
+                        method, password, host, port = m.groups()
+                        node_info.update({
+                            "server": host,
+                            "port": port,
+                            "method": method,
+                            "password": password
+                        })
+                except:
+                    # 如果解析失败，保持原始信息
+                    pass
+            
+            nodes.append(node_info)
         
-        return jsonify({"nodes": nodes, "total": len(nodes)})
+        data = {"nodes": nodes, "total": len(nodes)}
+        _nodes_cache.update(stat=key, data=data)
+        return _json(data)
     except Exception as e:
-        return jsonify({"nodes": [], "error": str(e)})
+        return _json({"nodes": [], "error": str(e)})
+
+@app.route('/api/nodes/list')
+def list_nodes_api():
+    """获取轻量节点列表（仅名称和类型，详情通过 /api/node/<id> 获取）"""
+    try:
+        key = _stat_key(NODES_FILE)
+        if key == _nodes_list_cache['stat']:
+            return _json(_nodes_list_cache['data'])
+        
+        nodes = []
+        lines, _, node_idx = _read_node_lines()
+        for idx, i in enumerate(node_idx):
+            line = lines[i]
+            nodes.append({
+                "name": _node_name(line, idx),
+                "type": SCHEME_TYPES.get(line.partition('://')[0], "Shadowsocks"),
+                "raw": line
+            })
+        
+        data = {"nodes": nodes, "total": len(nodes)}
+        _nodes_list_cache.update(stat=key, data=data)
+        return _json(data)
+    except Exception as e:
+        return _json({"nodes": [], "error": str(e)})
 
 @app.route('/api/node/<int:node_id>', methods=['GET', 'PUT', 'DELETE'])
 def manage_node(node_id):
     """管理单个节点"""
     try:
-        # 获取所有节点
-        with open(NODES_FILE, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
-        
-        if request.method == 'GET':
-            # 获取节点信息
-            if 0 <= node_id < len(lines):
-                line = lines[node_id]
-                result = parser.parse_link(line)
-                return jsonify(result)
-            else:
-                return jsonify({'error': '节点不存在'}), 404
-        
-        elif request.method == 'PUT':
-            # 更新节点
-            data = request.json
-            if 0 <= node_id < len(lines):
-                # 生成新的链接
-                new_link = parser.generate_link(data)
-                if new_link:
-                    lines[node_id] = new_link
-                    with open(NODES_FILE, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(lines))
-                    return jsonify({'status': 'success', 'message': '节点已更新'})
+        # 读取、修改、写回节点文件期间持有锁，避免并发请求互相覆盖
+        with _nodes_lock:
+            lines, ends, node_idx = _read_node_lines()
+            # 节点编号与 /api/nodes/list 一致，不计注释行
+            i = node_idx[node_id] if 0 <= node_id < len(node_idx) else None
+            
+            if request.method == 'GET':
+                # 获取节点信息
+                if i is not None:
+                    result = parser.parse_link(lines[i])
+                    return _json(result)
                 else:
-                    return jsonify({'error': '无法生成节点链接'}), 400
-            else:
-                return jsonify({'error': '节点不存在'}), 404
-        
-        elif request.method == 'DELETE':
-            # 删除节点
-            if 0 <= node_id < len(lines):
-                lines.pop(node_id)
-                with open(NODES_FILE, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(lines))
-                return jsonify({'status': 'success', 'message': '节点已删除'})
-            else:
-                return jsonify({'error': '节点不存在'}), 404
+                    return _json({'error': '节点不存在'}, 404)
+            
+            elif request.method == 'PUT':
+                # 更新节点
+                data = request.json
+                if i is not None:
+                    # 生成新的链接
+                    new_link = parser.generate_link(data)
+                    if new_link:
+                        lines[i] = new_link
+                        _write_nodes(lines)
+                        _invalidate_nodes_cache()
+                        return _json({'status': 'success', 'message': '节点已更新'})
+                    else:
+                        return _json({'error': '无法生成节点链接'}, 400)
+                else:
+                    return _json({'error': '节点不存在'}, 404)
+            
+            elif request.method == 'DELETE':
+                # 删除节点
+                if i is not None:
+                    if i == len(lines) - 1:
+                        # 删除文件最后一行时直接截断文件
+                        os.truncate(NODES_FILE, ends[i - 1] if i > 0 else 0)
+                    else:
+                        lines.pop(i)
+                        _write_nodes(lines)
+                    _invalidate_nodes_cache()
+                    return _json({'status': 'success', 'message': '节点已删除'})
+                else:
+                    return _json({'error': '节点不存在'}, 404)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _json({'error': str(e)}, 500)
+
+def _read_node_lines():
+    """读取非空行及每行在文件中的结束字节偏移，并返回节点行（非注释行）的下标"""
+    lines, ends, node_idx = [], [], []
+    offset = 0
+    with open(NODES_FILE, 'rb') as f:
+        for raw in f:
+            line = raw.strip()
+            if line:
+                if not line.startswith(b'#'):
+                    node_idx.append(len(lines))
+                lines.append(line.decode('utf-8'))
+                ends.append(offset + len(raw.rstrip()))
+            offset += len(raw)
+    return lines, ends, node_idx
+
+def _write_nodes(content):
+    """写入同目录下的唯一临时文件后原子替换节点文件，content 为行列表或文本"""
+    if not isinstance(content, str):
+        content = '\n'.join(content)
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(NODES_FILE), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # mkstemp 创建的文件权限为 0600，沿用原文件权限
+        try:
+            os.chmod(tmp_file, os.stat(NODES_FILE).st_mode & 0o777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_file, NODES_FILE)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
 
 @app.route('/api/protocols')
 def get_protocols():
     """获取支持的协议列表"""
-    return jsonify(parser.supported_protocols)
+    return _json(parser.supported_protocols)
+
+# 已解析的配置文件缓存，配置文件变化时失效
+_cfg_cache = {'stat': None, 'data': None}
+
+def _load_cfg():
+    """加载OpenClash配置（带缓存）"""
+    key = _stat_key(CONFIG_FILE)
+    if key != _cfg_cache['stat']:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            data = yaml.load(f, Loader=SafeLoader)
+        _cfg_cache['data'] = data
+        _cfg_cache['stat'] = key
+    return _cfg_cache['data']
 
 @app.route('/api/proxy_groups')
 def get_proxy_groups():
     """获取策略组列表"""
     try:
-        config_path = "/etc/openclash/config.yaml"
-        if not os.path.exists(config_path):
-            return jsonify({"groups": [], "error": "配置文件不存在"})
+        if not os.path.exists(CONFIG_FILE):
+            return _json({"groups": [], "error": "配置文件不存在"})
         
-        with open(config_path, 'r', encoding='utf-8') as f:
-            import yaml
-            config = yaml.safe_load(f)
+        config = _load_cfg()
         
         groups = config.get('proxy-groups', [])
-        return jsonify({"groups": groups})
+        return _json({"groups": groups})
     except Exception as e:
-        return jsonify({"groups": [], "error": str(e)})
+        return _json({"groups": [], "error": str(e)})
 
 @app.route('/api/proxy_groups/<group_name>', methods=['GET', 'PUT'])
 def manage_proxy_group(group_name):
     """管理单个策略组"""
     try:
-        config_path = "/etc/openclash/config.yaml"
-        with open(config_path, 'r', encoding='utf-8') as f:
-            import yaml
-            config = yaml.safe_load(f)
+        config = _load_cfg()
         
         groups = config.get('proxy-groups', [])
         group = None
@@ -381,18 +697,27 @@ def manage_proxy_group(group_name):
                 break
         
         if request.method == 'GET':
-            return jsonify(group or {})
+            return _json(group or {})
         elif request.method == 'PUT':
             data = request.json
             if group:
+                # 缓存对象将被修改，写入前先使其失效
+                _cfg_cache['stat'] = None
                 group.update(data)
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    yaml.dump(config, f, default_flow_style=False)
-                return jsonify({"status": "success", "message": "策略组已更新"})
+                with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+                    yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False)
+                return _json({"status": "success", "message": "策略组已更新"})
             else:
-                return jsonify({"status": "error", "message": "策略组不存在"})
+                return _json({"status": "error", "message": "策略组不存在"})
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+        return _json({"status": "error", "message": str(e)})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=False) 
\ No newline at end of file
+    try:
+        from waitress import serve
+    except ImportError:
+        # 未安装 waitress 时退回到 Flask 自带的多线程服务器
+        app.run(host='0.0.0.0', port=8080, debug=False, threaded=True)
+    else:
+        serve(app, host='0.0.0.0', port=8080, threads=4,
+              connection_limit=100, channel_timeout=30) 
\ No newline at end of file